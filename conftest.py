@@ -0,0 +1 @@
+# Keeps the repository root importable (utils.utils) when running plain `pytest`
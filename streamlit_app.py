@@ -4,7 +4,13 @@ from waybacktweets import WaybackTweets, TweetsParser, TweetsExporter
 from datetime import datetime
 import requests
 from pandas import json_normalize
-from utils.utils import rotate_headers
+from utils.utils import (
+    get_cached_memorylol_response,
+    fetch_memorylol_account_info,
+    resolve_memorylol_aliases,
+    get_cdx_response,
+    merge_cdx_rows,
+)
 import re
 import hmac
 
@@ -50,7 +56,7 @@ st.set_page_config(
 # Step 1: Memory.lol API call
 def get_memorylol_account_info(username):
     """
-    Get account information from Memory.lol API
+    Get account information from the local alias cache or Memory.lol API
     
     Args:
         username (str): Twitter username without @
@@ -58,16 +64,12 @@ def get_memorylol_account_info(username):
     Returns:
         dict: Account information or None if error
     """
-    
-    headers = rotate_headers()
+    cached = get_cached_memorylol_response(username)
+    if cached is not None:
+        return cached
     
     try:
-        url = f"https://api.memory.lol/v1/tw/{username}"
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        
-        data = response.json()
-        return data
+        return fetch_memorylol_account_info(username)
         
     except Exception as e:
         st.error(f"❌ Error fetching Memory.lol data: {e}")
@@ -108,6 +110,75 @@ def display_memorylol_summary(username):
     
     return summary_data
 
+# Step 2a: Query the Wayback CDX API, in date windows for long ranges
+def fetch_cdx_shard(username, from_date=None, to_date=None, limit=None):
+    """
+    Run a single WaybackTweets CDX query
+    
+    Returns:
+        tuple: (cdx_rows, {"show_resume_key": bool}), or None if the request failed or found nothing
+    """
+    # Initialize API with parameters
+    api_params = {'username': username}
+    
+    if from_date:
+        api_params['timestamp_from'] = from_date
+    if to_date:
+        api_params['timestamp_to'] = to_date
+    if limit:
+        api_params['limit'] = limit
+        
+    api = WaybackTweets(**api_params)
+    return api.get()
+
+def get_sharded_cdx_response(username, from_date=None, to_date=None, limit=None):
+    """
+    Get archived tweet captures, querying long date ranges as concurrent date
+    windows that are split further wherever the account has many captures.
+    Partial results are shown as each window completes.
+    
+    Args:
+        username (str): Twitter username without @
+        from_date (str): Start date in YYYYmmdd format
+        to_date (str): End date in YYYYmmdd format
+        limit (int): Maximum number of results
+        
+    Returns:
+        tuple: (cdx_rows, {"show_resume_key": bool}) as returned by
+        WaybackTweets.get(), or None if nothing was found
+    """
+    # Placeholders render nothing unless the range is actually sharded
+    progress = st.empty()
+    preview = st.empty()
+    
+    def show_progress(completed, total, header, rows):
+        progress.progress(
+            min(completed / total, 1.0),
+            text=f"Queried {completed}/{total} date ranges, {len(rows)} captures so far"
+        )
+        if header:
+            preview.dataframe(
+                pd.DataFrame(merge_cdx_rows(header, rows, limit), columns=header),
+                height=200
+            )
+    
+    response, failed = get_cdx_response(
+        username,
+        from_date=from_date,
+        to_date=to_date,
+        limit=limit,
+        single_request=lambda: fetch_cdx_shard(username, from_date, to_date, limit),
+        on_progress=show_progress
+    )
+    
+    progress.empty()
+    preview.empty()
+    
+    for shard, attempts in failed:
+        st.warning(f"⚠️ Could not fetch captures from {shard[0]} to {shard[1]} after {attempts} attempts")
+    
+    return response
+
 # Step 2: Fetch and parse tweets using WaybackTweets
 def get_waybacktweets_archive(username, from_date=None, to_date=None, limit=None):
     """
@@ -123,18 +194,7 @@ def get_waybacktweets_archive(username, from_date=None, to_date=None, limit=None
         tuple: (parsed_tweets, dataframe) or (None, None) if error
     """
     try:
-        # Initialize API with parameters
-        api_params = {'username': username}
-        
-        if from_date:
-            api_params['timestamp_from'] = from_date
-        if to_date:
-            api_params['timestamp_to'] = to_date
-        if limit:
-            api_params['limit'] = limit
-            
-        api = WaybackTweets(**api_params)
-        archived_tweets = api.get()
+        archived_tweets = get_sharded_cdx_response(username, from_date, to_date, limit)
         
         if not archived_tweets:
             st.warning("No archived tweets found.")
@@ -152,7 +212,6 @@ def get_waybacktweets_archive(username, from_date=None, to_date=None, limit=None
             "available_tweet_text",
             "available_tweet_is_RT",
             "available_tweet_info",
-            "resumption_key",
         ]
         
         # Parse tweets
@@ -220,7 +279,6 @@ def export_to_dataframe(parsed_tweets, username):
         "archived_statuscode",
         "archived_digest",
         "archived_length",
-        "resumption_key",
     ]
     
     try:
@@ -303,6 +361,7 @@ def main():
         st.sidebar.info(f"If empty, using today's date: {TO_DATE}")
     
     LIMIT = st.sidebar.number_input("Limit (optional)", min_value=1, value=None, placeholder="Leave empty for no limit", help="Sets the maximum number of results to return")
+    CHECK_PREVIOUS_NAMES = st.sidebar.checkbox("Check previous screen names", value=False, help="Also look up other accounts that used this account's previous screen names")
     
     # Keywords for filtering
     st.sidebar.header("Keyword Filtering")
@@ -336,6 +395,32 @@ def main():
                 st.subheader("👤 Profile Name History")
                 for name_info in memorylol_data['known_screen_names']:
                     st.write(f"**@{name_info['name']}** - {name_info['date_range']}")
+
+                # Look up every previous screen name to find other accounts that used it
+                if CHECK_PREVIOUS_NAMES:
+                    previous_names = [
+                        name_info['name'] for name_info in memorylol_data['known_screen_names']
+                        if name_info['name'].lower() != USERNAME.lower()
+                    ]
+                    known_ids = set(memorylol_data['account_ids'])
+                    shared_names = []
+                    results, errors = resolve_memorylol_aliases(previous_names)
+                    for name, e in errors.items():
+                        st.error(f"❌ Error fetching Memory.lol data for @{name}: {e}")
+                    for name, info in results.items():
+                        other_ids = [
+                            account.get('id_str', 'N/A') for account in (info or {}).get('accounts', [])
+                            if account.get('id_str') not in known_ids
+                        ]
+                        if other_ids:
+                            shared_names.append((name, other_ids))
+                    
+                    st.subheader("🔁 Previous Screen Names Used by Other Accounts")
+                    if shared_names:
+                        for name, other_ids in shared_names:
+                            st.write(f"**@{name}** - also used by account ID(s) {', '.join(other_ids)}")
+                    else:
+                        st.info("No other accounts found using these screen names")
             else:
                 st.info(f"No known screen names found for @{USERNAME}")
             
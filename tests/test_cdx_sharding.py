@@ -0,0 +1,192 @@
+import threading
+
+import pytest
+import requests
+
+from utils import utils
+from utils.utils import fetch_cdx_shards, get_cdx_response, plan_cdx_shards, query_cdx_window
+
+HEADER = ["urlkey", "timestamp", "original", "mimetype", "statuscode", "digest", "length"]
+
+
+class FakeCdx:
+    """ Mimics the CDX API: rows come back sorted by urlkey (status ID), not by timestamp"""
+
+    def __init__(self, captures, errors=None):
+        # captures: list of (status_id, timestamp); errors: {from_date: failures left}
+        self.captures = captures
+        self.errors = dict(errors or {})
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, from_date, to_date, limit=None):
+        with self.lock:
+            self.calls.append((from_date, to_date, limit))
+            if self.errors.get(from_date):
+                self.errors[from_date] -= 1
+                raise requests.exceptions.ReadTimeout("timed out")
+        rows = sorted(
+            [f"com,twitter)/user/status/{status_id}", timestamp, f"https://twitter.com/user/status/{status_id}",
+             "text/html", "200", "DIGEST", "1000"]
+            for status_id, timestamp in self.captures
+            if from_date <= timestamp[:8] <= to_date
+        )
+        if limit:
+            rows = rows[:limit]
+        return [HEADER] + rows if rows else []
+
+
+class StubWaybackTweets:
+    """ Mimics waybacktweets 1.0: get() returns (cdx_rows, {"show_resume_key": bool}) or None"""
+
+    def __init__(self, username, timestamp_from=None, timestamp_to=None, limit=None):
+        self.username = username
+        self.limit = limit
+
+    def get(self):
+        rows = [HEADER, ["com,twitter)/user/status/1", "20200101120000", "https://twitter.com/user/status/1",
+                         "text/html", "200", "DIGEST", "1000"]]
+        if self.limit:
+            return rows + [[], ["resumekey"]], {"show_resume_key": True}
+        return rows, {"show_resume_key": False}
+
+
+def test_plan_cdx_shards_covers_range_in_equal_windows():
+    shards = plan_cdx_shards("20060321", "20251231")
+
+    assert len(shards) == utils.CDX_MAX_SHARDS
+    assert shards[0][0] == "20060321" and shards[-1][1] == "20251231"
+    assert plan_cdx_shards("20250601", "20250926") == [("20250601", "20250926")]
+    with pytest.raises(ValueError):
+        plan_cdx_shards("20250926", "20250601")
+
+
+def test_query_cdx_window_tells_empty_windows_from_errors(monkeypatch):
+    class Response:
+        def __init__(self, text, status=200):
+            self.text = text
+            self.status = status
+
+        def raise_for_status(self):
+            if self.status >= 400:
+                raise requests.exceptions.HTTPError(str(self.status))
+
+        def json(self):
+            import json
+            return json.loads(self.text)
+
+    calls = []
+    responses = iter([Response("[]"), Response(""), Response("", 503)])
+    monkeypatch.setattr(utils.requests, "get", lambda url, **kwargs: calls.append(kwargs) or next(responses))
+
+    assert query_cdx_window("user", "20200101", "20201231") == []
+    assert query_cdx_window("user", "20200101", "20201231") == []
+    with pytest.raises(requests.exceptions.HTTPError):
+        query_cdx_window("user", "20200101", "20201231")
+    assert calls[0]["timeout"] == utils.CDX_TIMEOUT
+    assert calls[0]["params"]["from"] == "20200101"
+
+
+def test_empty_windows_cost_one_request_and_no_failures():
+    shards = plan_cdx_shards("20060321", "20251231")
+    cdx = FakeCdx([(1, "20240105120000")])
+
+    header, rows, failed = fetch_cdx_shards(cdx, shards)
+
+    assert failed == []
+    assert len(cdx.calls) == len(shards)
+    assert [row[1] for row in rows] == ["20240105120000"]
+
+
+def test_failed_window_is_retried_and_split():
+    shards = plan_cdx_shards("20120101", "20191231")
+    cdx = FakeCdx([(1, shards[1][0] + "120000"), (2, shards[1][1] + "120000")], errors={shards[1][0]: 1})
+
+    header, rows, failed = fetch_cdx_shards(cdx, shards)
+
+    assert failed == []
+    assert len(cdx.calls) == len(shards) + 2
+    assert [row[1] for row in rows] == [shards[1][0] + "120000", shards[1][1] + "120000"]
+
+
+def test_window_failing_every_attempt_is_reported():
+    shards = [("20200101", "20200101"), ("20200102", "20200102")]
+    cdx = FakeCdx([(1, "20200101120000")], errors={"20200102": 5})
+
+    header, rows, failed = fetch_cdx_shards(cdx, shards, max_attempts=2)
+
+    assert failed == [(("20200102", "20200102"), 2)]
+    assert [row[1] for row in rows] == ["20200101120000"]
+
+
+def test_dense_window_is_split_until_complete():
+    captures = [(i, f"202001{day:02d}120000") for i, day in enumerate(range(1, 29), 1)]
+    cdx = FakeCdx(captures)
+
+    header, rows, failed = fetch_cdx_shards(cdx, [("20200101", "20200128")], row_cap=5)
+
+    assert len(rows) == len(captures)
+    # Every kept window came back under the cap
+    assert all(limit is None or limit == 5 for _, _, limit in cdx.calls)
+    assert len(cdx.calls) > 1
+
+
+def test_limit_keeps_earliest_captures_when_urlkey_order_differs():
+    # Higher status IDs were captured earlier, so urlkey order is the reverse of time order
+    captures = [(100 - day, f"201201{day:02d}120000") for day in range(1, 21)]
+    captures += [(200 + day, f"201901{day:02d}120000") for day in range(1, 6)]
+    shards = plan_cdx_shards("20120101", "20191231")
+    cdx = FakeCdx(captures)
+
+    header, rows, failed = fetch_cdx_shards(cdx, shards, limit=3)
+
+    assert [row[1] for row in rows] == ["20120101120000", "20120102120000", "20120103120000"]
+
+
+def test_limit_stops_later_windows():
+    shards = plan_cdx_shards("20120101", "20191231")
+    captures = [(i, shards[0][0][:6] + f"{day:02d}120000") for i, day in enumerate(range(1, 6), 1)]
+    cdx = FakeCdx(captures)
+    release = threading.Event()
+
+    def fetch(shard_from, shard_to, limit):
+        # Hold later windows so the first one finishes before anything else
+        if shard_from != shards[0][0]:
+            release.wait(5)
+        return cdx(shard_from, shard_to, limit)
+
+    try:
+        header, rows, failed = fetch_cdx_shards(fetch, shards, limit=3, max_workers=1)
+    finally:
+        release.set()
+
+    assert len(rows) == 3
+    # Only the window already running when the limit was reached was started
+    assert len(cdx.calls) <= 2
+
+
+def test_get_cdx_response_uses_single_request_for_short_or_unparseable_ranges():
+    def single_request():
+        return StubWaybackTweets("user", limit=10).get()
+
+    def fetch_window(*args):
+        raise AssertionError("should not shard")
+
+    for from_date, to_date in [("20250601", "20250926"), ("June 2025", "20250926")]:
+        response, failed = get_cdx_response("user", from_date, to_date, 10, single_request, fetch_window)
+        assert response[1] == {"show_resume_key": True}
+        assert failed == []
+
+
+def test_get_cdx_response_returns_waybacktweets_shape_for_sharded_ranges():
+    cdx = FakeCdx([(2, "20190101120000"), (1, "20120101120000")])
+
+    response, failed = get_cdx_response("user", "20120101", "20191231", None, None, cdx)
+
+    cdx_rows, meta = response
+    assert cdx_rows[0] == HEADER
+    assert [row[1] for row in cdx_rows[1:]] == ["20120101120000", "20190101120000"]
+    assert meta == {"show_resume_key": False}
+
+    response, failed = get_cdx_response("user", "20120101", "20191231", None, None, FakeCdx([]))
+    assert response is None and failed == []
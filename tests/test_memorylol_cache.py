@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from utils import utils
+from utils.utils import cache_memorylol_response, get_cached_memorylol_response, resolve_memorylol_aliases
+
+
+def account(id_str, *names):
+    return {'id_str': id_str, 'screen_names': {name: ['2020-01-01'] for name in names}}
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """ Empty caches and a controllable clock for every test"""
+    now = [1000.0]
+    monkeypatch.setattr(utils, "_now", lambda: now[0])
+    for cache in (utils._memorylol_accounts, utils._memorylol_aliases, utils._memorylol_not_found):
+        cache.clear()
+    return now
+
+
+def test_lookup_is_case_insensitive():
+    cache_memorylol_response('Alice', {'accounts': [account('1', 'alice')]})
+
+    assert get_cached_memorylol_response('ALICE') == {'accounts': [account('1', 'alice')]}
+
+
+def test_historical_names_are_not_served_from_cache():
+    cache_memorylol_response('alice', {'accounts': [account('1', 'alice', 'bob')]})
+
+    assert get_cached_memorylol_response('bob') is None
+
+
+def test_positive_entries_expire_after_ttl(clock):
+    cache_memorylol_response('alice', {'accounts': [account('1', 'alice')]})
+
+    clock[0] += utils.MEMORYLOL_CACHE_TTL - 1
+    assert get_cached_memorylol_response('alice') is not None
+    clock[0] += 2
+    assert get_cached_memorylol_response('alice') is None
+
+
+def test_empty_results_expire_after_negative_ttl(clock):
+    cache_memorylol_response('ghost', {'accounts': []})
+
+    assert get_cached_memorylol_response('ghost') == {'accounts': []}
+    clock[0] += utils.MEMORYLOL_NEGATIVE_CACHE_TTL + 1
+    assert get_cached_memorylol_response('ghost') is None
+
+
+def test_entry_is_a_miss_when_one_of_its_accounts_is_gone():
+    cache_memorylol_response('alice', {'accounts': [account('1', 'alice'), account('2', 'alice')]})
+    # Simulates account 2 being evicted from the size-bounded account store
+    with utils._memorylol_lock:
+        utils._memorylol_accounts.pop('2')
+
+    assert get_cached_memorylol_response('alice') is None
+
+
+def test_bulk_resolver_dedupes_and_uses_cache(monkeypatch):
+    cache_memorylol_response('alice', {'accounts': [account('1', 'alice')]})
+    fetched = []
+    lock = threading.Lock()
+
+    def fetch(handle):
+        with lock:
+            fetched.append(handle)
+        if handle == 'broken':
+            raise RuntimeError("timed out")
+        data = {'accounts': [account(str(len(handle)), handle)]}
+        cache_memorylol_response(handle, data)
+        return data
+
+    monkeypatch.setattr(utils, "fetch_memorylol_account_info", fetch)
+
+    results, errors = resolve_memorylol_aliases(['Alice', '@bob', 'BOB', ' bob ', 'broken', ''])
+
+    assert sorted(fetched) == ['bob', 'broken']
+    assert list(results) == ['alice', 'bob', 'broken']
+    assert results['alice'] == {'accounts': [account('1', 'alice')]}
+    assert results['broken'] is None
+    assert list(errors) == ['broken']
+
+    fetched.clear()
+    results, errors = resolve_memorylol_aliases(['bob'])
+    assert fetched == [] and results['bob'] is not None
+
+
+def test_fetch_uses_timeout(monkeypatch):
+    calls = []
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {'accounts': [account('1', 'alice')]}
+
+    monkeypatch.setattr(utils.requests, "get", lambda url, **kwargs: calls.append(kwargs) or Response())
+
+    utils.fetch_memorylol_account_info('alice')
+
+    assert calls[0]['timeout'] == utils.MEMORYLOL_TIMEOUT
+    assert get_cached_memorylol_response('alice') is not None
@@ -1,4 +1,11 @@
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+
+import requests
+from cachetools import TTLCache
 
 # ------------------------------------------------------------------------------
 # REQUESTS INFRASTRUCTURE
@@ -37,4 +44,312 @@ def rotate_headers():
         "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"
     ])
     headers["Accept-Encoding"] = random.choice(["gzip, deflate, br", "gzip, deflate"])
-    return headers
\ No newline at end of file
+    return headers
+
+# ------------------------------------------------------------------------------
+# MEMORY.LOL ALIAS CACHE
+# ------------------------------------------------------------------------------
+
+# Screen-name history changes rarely, so cached lookups stay valid for a day
+MEMORYLOL_CACHE_TTL = 24 * 60 * 60
+# Handles with no Memory.lol record are re-checked sooner
+MEMORYLOL_NEGATIVE_CACHE_TTL = 60 * 60
+# Entries kept per cache before the oldest are evicted
+MEMORYLOL_CACHE_SIZE = 10000
+MEMORYLOL_TIMEOUT = 30
+
+def _now():
+    return time.monotonic()
+
+# Accounts keyed by id_str, shared by every cached lookup that returned them,
+# and queried screen names (lowercased) mapped to id_str lists. The caches live
+# for the whole Streamlit server, so they are bounded and expire on their own.
+_memorylol_accounts = TTLCache(maxsize=MEMORYLOL_CACHE_SIZE, ttl=MEMORYLOL_CACHE_TTL, timer=lambda: _now())
+_memorylol_aliases = TTLCache(maxsize=MEMORYLOL_CACHE_SIZE, ttl=MEMORYLOL_CACHE_TTL, timer=lambda: _now())
+_memorylol_not_found = TTLCache(maxsize=MEMORYLOL_CACHE_SIZE, ttl=MEMORYLOL_NEGATIVE_CACHE_TTL, timer=lambda: _now())
+_memorylol_lock = threading.Lock()
+
+def cache_memorylol_response(username, data):
+    """ Store a Memory.lol response by the queried screen name and by account id_str"""
+    accounts = (data or {}).get('accounts') or []
+    with _memorylol_lock:
+        if not accounts:
+            _memorylol_not_found[username.lower()] = True
+            return
+        # Accounts without an id_str cannot be rebuilt later, so skip caching
+        if not all(account.get('id_str') for account in accounts):
+            return
+        for account in accounts:
+            _memorylol_accounts[account['id_str']] = account
+        # Only the queried handle is a complete alias entry; historical screen
+        # names of these accounts may also belong to accounts not seen yet
+        _memorylol_aliases[username.lower()] = [account['id_str'] for account in accounts]
+        _memorylol_not_found.pop(username.lower(), None)
+
+def get_cached_memorylol_response(username):
+    """ Rebuild a Memory.lol response for a queried screen name from the cache, or None"""
+    with _memorylol_lock:
+        if username.lower() in _memorylol_not_found:
+            return {'accounts': []}
+        ids = _memorylol_aliases.get(username.lower())
+        if ids is None:
+            return None
+        accounts = []
+        for id_str in ids:
+            account = _memorylol_accounts.get(id_str)
+            # Any expired or evicted account invalidates the whole alias entry
+            if account is None:
+                return None
+            accounts.append(account)
+        return {'accounts': accounts}
+
+def fetch_memorylol_account_info(username):
+    """ Fetch account information from the Memory.lol API and cache it. Raises on request errors."""
+    url = f"https://api.memory.lol/v1/tw/{username}"
+    response = requests.get(url, headers=rotate_headers(), timeout=MEMORYLOL_TIMEOUT)
+    response.raise_for_status()
+
+    data = response.json()
+    cache_memorylol_response(username, data)
+    return data
+
+def resolve_memorylol_aliases(usernames, max_workers=8):
+    """ Look up many usernames concurrently.
+
+    Duplicate handles are looked up once, handles with a cached lookup are
+    served from the cache, and the rest are fetched on a bounded thread pool.
+    Returns (results, errors), both keyed by lowercased username; results hold
+    None for handles that failed.
+    """
+    handles = list(dict.fromkeys(u.strip().lstrip('@').lower() for u in usernames if u and u.strip()))
+    results = {}
+    errors = {}
+
+    pending = []
+    for handle in handles:
+        cached = get_cached_memorylol_response(handle)
+        if cached is not None:
+            results[handle] = cached
+        else:
+            pending.append(handle)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch_memorylol_account_info, handle): handle for handle in pending}
+            for future in as_completed(futures):
+                handle = futures[future]
+                try:
+                    results[handle] = future.result()
+                except Exception as e:
+                    errors[handle] = e
+                    results[handle] = None
+
+    return {handle: results[handle] for handle in handles}, errors
+
+# ------------------------------------------------------------------------------
+# CDX SHARDING
+# ------------------------------------------------------------------------------
+
+# Earliest date worth querying when no start date is given (Twitter launch)
+CDX_EARLIEST_DATE = "20060321"
+
+CDX_URL = "https://web.archive.org/cdx/search/cdx"
+CDX_TIMEOUT = 60
+
+# Ranges are first cut into windows of about this many days, at most CDX_MAX_SHARDS
+CDX_SHARD_DAYS = 2 * 365
+CDX_MAX_SHARDS = 8
+
+# A window returning this many rows may be truncated and is split in half instead
+CDX_SHARD_ROW_CAP = 5000
+
+def query_cdx_window(username, from_date, to_date, limit=CDX_SHARD_ROW_CAP, timeout=CDX_TIMEOUT):
+    """ Query the Wayback CDX API for one account's status captures in an inclusive YYYYmmdd window.
+
+    Returns the CDX rows with the header first, or [] when the window has no
+    captures. Raises on timeouts, connection and HTTP errors, unlike
+    WaybackTweets.get(), which returns None for both errors and empty results.
+    """
+    params = {
+        "url": f"https://twitter.com/{username}/status/*",
+        "output": "json",
+        "from": from_date,
+        "to": to_date,
+    }
+    if limit:
+        params["limit"] = limit
+
+    response = requests.get(CDX_URL, params=params, headers={"User-Agent": get_random_user_agent()}, timeout=timeout)
+    response.raise_for_status()
+    if not response.text.strip():
+        return []
+    return response.json()
+
+def plan_cdx_shards(from_date, to_date, shard_days=CDX_SHARD_DAYS, max_shards=CDX_MAX_SHARDS):
+    """ Split an inclusive YYYYmmdd date range into equal (from, to) windows.
+
+    This is only the starting plan: fetch_cdx_shards() splits windows further
+    wherever the account turns out to have too many captures.
+    """
+    start = datetime.strptime(from_date[:8], "%Y%m%d")
+    end = datetime.strptime(to_date[:8], "%Y%m%d")
+    if end < start:
+        raise ValueError(f"End date {to_date} is before start date {from_date}")
+
+    total_days = (end - start).days + 1
+    count = min(max_shards, -(-total_days // shard_days))
+    shards = []
+    for i in range(count):
+        shard_start = start + timedelta(days=total_days * i // count)
+        shard_end = start + timedelta(days=total_days * (i + 1) // count - 1)
+        shards.append((shard_start.strftime("%Y%m%d"), shard_end.strftime("%Y%m%d")))
+    return shards
+
+def split_cdx_shard(shard):
+    """ Split a (from, to) YYYYmmdd window in half, or return None for a single day"""
+    start = datetime.strptime(shard[0], "%Y%m%d")
+    end = datetime.strptime(shard[1], "%Y%m%d")
+    if end <= start:
+        return None
+    middle = start + (end - start) // 2
+    return [
+        (shard[0], middle.strftime("%Y%m%d")),
+        ((middle + timedelta(days=1)).strftime("%Y%m%d"), shard[1]),
+    ]
+
+def merge_cdx_rows(header, rows, limit=None):
+    """ Merge CDX rows from several shards in timestamp order, honoring the global limit"""
+    ts_index = header.index('timestamp') if 'timestamp' in header else 1
+    # Shards do not overlap, but drop exact duplicates just in case
+    unique_rows = {tuple(row): row for row in rows}.values()
+    merged = sorted(unique_rows, key=lambda row: row[ts_index])
+    if limit:
+        merged = merged[:limit]
+    return merged
+
+def _limit_reached(shard_rows, pending_shards, limit):
+    """ Whether the finished shards before the earliest pending one already hold `limit` rows"""
+    earliest_pending = min((shard[0] for shard in pending_shards), default=None)
+    prefix_rows = sum(
+        count for shard, count in shard_rows.items()
+        if earliest_pending is None or shard[1] < earliest_pending
+    )
+    return prefix_rows >= limit
+
+def fetch_cdx_shards(fetch_window, shards, limit=None, max_workers=4, max_attempts=3,
+                     row_cap=CDX_SHARD_ROW_CAP, on_progress=None):
+    """ Query CDX date windows concurrently and merge their captures.
+
+    fetch_window(from_date, to_date, limit) must behave like query_cdx_window().
+    Windows are queried with row_cap rather than the global limit, because CDX
+    returns rows in urlkey order and a cut-off window would not hold its
+    earliest captures. A window that comes back at row_cap is split in half
+    and queried again, so every kept window is complete; single days are
+    queried without a cap. A window that raises is retried on its own, split
+    in half when possible. Empty windows are done after one request.
+
+    With a limit, later windows are cancelled once the complete windows before
+    them already hold `limit` rows. on_progress(completed, total, header, rows)
+    is called from the calling thread after each finished window.
+
+    Returns (header, merged_rows, failed) where failed lists (window, attempts).
+    """
+    header = None
+    rows = []
+    shard_rows = {}
+    failed = []
+    completed = 0
+
+    def submit(shard, attempt):
+        cap = None if shard[0] == shard[1] else row_cap
+        futures[executor.submit(fetch_window, shard[0], shard[1], cap)] = (shard, attempt)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {}
+    for shard in shards:
+        submit(shard, 1)
+    total = len(futures)
+
+    try:
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard, attempt = futures.pop(future)
+                try:
+                    cdx_rows = future.result()
+                except Exception:
+                    if attempt >= max_attempts:
+                        failed.append((shard, attempt))
+                        # Nothing more will come from this window
+                        shard_rows[shard] = 0
+                        completed += 1
+                        continue
+                    # Retry on its own, in smaller windows when the shard can be split
+                    retries = split_cdx_shard(shard) or [shard]
+                    total += len(retries) - 1
+                    for retry in retries:
+                        submit(retry, attempt + 1)
+                    continue
+
+                new_rows = [row for row in cdx_rows[1:] if row]
+                halves = split_cdx_shard(shard)
+                if halves and row_cap and len(new_rows) >= row_cap:
+                    # Dense window: the rows may be truncated, so query both halves instead
+                    total += 1
+                    for half in halves:
+                        submit(half, attempt)
+                    continue
+
+                if new_rows:
+                    header = header or cdx_rows[0]
+                    rows.extend(new_rows)
+                shard_rows[shard] = len(new_rows)
+                completed += 1
+
+                if on_progress:
+                    on_progress(completed, total, header, rows)
+
+            # Later windows cannot add rows that sort before the ones already held
+            if limit and futures and _limit_reached(shard_rows, [s for s, _ in futures.values()], limit):
+                for future in futures:
+                    future.cancel()
+                futures = {}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if not header:
+        return None, [], failed
+    return header, merge_cdx_rows(header, rows, limit), failed
+
+def get_cdx_response(username, from_date=None, to_date=None, limit=None, single_request=None,
+                     fetch_window=None, on_progress=None, **shard_options):
+    """ Get an account's status captures, sharding long date ranges.
+
+    Ranges that plan to a single window, or whose dates cannot be parsed, are
+    sent as one request through single_request(), which should return a
+    WaybackTweets.get() result. Longer ranges go through fetch_cdx_shards().
+
+    Returns (response, failed): response has the WaybackTweets.get() shape
+    (cdx_rows, {"show_resume_key": bool}) or is None, and failed lists the
+    (window, attempts) that could not be fetched.
+    """
+    try:
+        shards = plan_cdx_shards(
+            from_date or CDX_EARLIEST_DATE,
+            to_date or datetime.now().strftime("%Y%m%d")
+        )
+    except ValueError:
+        # Unparseable or reversed dates: let the CDX API handle the range as given
+        shards = None
+
+    if not shards or len(shards) == 1:
+        return single_request(), []
+
+    fetch_window = fetch_window or (
+        lambda shard_from, shard_to, cap: query_cdx_window(username, shard_from, shard_to, cap)
+    )
+    header, rows, failed = fetch_cdx_shards(fetch_window, shards, limit=limit, on_progress=on_progress, **shard_options)
+    if not header:
+        return None, failed
+    # A merged result has no single CDX resume key
+    return ([header] + rows, {"show_resume_key": False}), failed